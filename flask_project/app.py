@@ -1,15 +1,20 @@
 import pdfkit
 import io
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, make_response
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, make_response, send_from_directory, abort
 from dotenv import load_dotenv
 from datetime import datetime
 from models import db, Trip
 from functions.forms import DestinationForm, DatesForm, AccommodationForm, TransportationForm, PlacesOfInterestForm, LoginForm, SignupForm
-from functions.utils import get_nominatim_suggestions, get_nearby_places, get_weather, generate_gemini_text, calculate_estimated_cost, get_place_details, generate_itinerary
+from functions.utils import get_nominatim_suggestions, get_nearby_places, get_weather, calculate_estimated_cost, get_place_details, generate_itinerary
+from functions.travel_tips import get_travel_tips, warm_travel_tips
+from functions.places_geo import build_cluster_index, parse_bbox, places_geojson
+from functions.costs import compare_trip_costs, TRANSPORT_METHODS
+from functions.images import IMAGE_BUILD_DIR, is_variant_filename, build_image_variants, reset_image_manifest, destination_image_name, image_variant, image_srcset_entries
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 import json
 import os
+import click
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from models import User
 
@@ -44,6 +49,29 @@ login_manager.login_view = 'login'
 def load_user(user_id):
     return User.query.get(int(user_id))
 
+def image_url(name, width=1600):
+    """URL of the best built variant of a static image, or of the original if none is built."""
+    filename, optimized = image_variant(name, width)
+    if optimized:
+        return url_for('optimized_image', filename=filename)
+    return url_for('static', filename=filename)
+
+def image_srcset(name):
+    return ', '.join(f"{url_for('optimized_image', filename=filename)} {width}w" for filename, width in image_srcset_entries(name))
+
+@app.context_processor
+def inject_image_helpers():
+    return dict(image_url=image_url, image_srcset=image_srcset, destination_image_name=destination_image_name)
+
+@app.route('/assets/images/<path:filename>')
+def optimized_image(filename):
+    # Only content-hashed variant names are served, so they can be cached forever
+    if not is_variant_filename(filename):
+        abort(404)
+    response = send_from_directory(IMAGE_BUILD_DIR, filename)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
 # Global variables to hold the form data across routes.
 destination_data = {}
 dates_data = {}
@@ -51,6 +79,9 @@ accommodation_data = {}
 transportation_data = {}
 places_of_interest_data = {}
 
+INITIAL_PLACES_SHOWN = 12  # Place cards rendered inline on the places of interest page
+MAX_COST_SCENARIOS = 10000  # Upper bound on the size of a /api/costs/compare grid
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     form = DestinationForm()
@@ -140,6 +171,9 @@ def accommodation():
     if form.validate_on_submit():
         accommodation_data['accommodation_name'] = form.accommodation.data
         accommodation_data['accommodation_details'] = form.accommodation_details.data
+        # Listings have no prices, so the chosen place's OSM type (hostel, hotel, ...) scales the destination rate
+        chosen = next((place for place in accommodations if place['name'] == form.accommodation.data), None)
+        accommodation_data['accommodation_type'] = chosen['osm_type'] if chosen else None
         return redirect(url_for('place_information'))
     return render_template('accommodation.html', form=form, accommodations=accommodations)
 
@@ -152,7 +186,7 @@ def place_information():
     end_date = dates_data.get('end_date', datetime.now()).strftime('%Y-%m-%d')
 
     weather = get_weather(destination_data['latitude'], destination_data['longitude'], start_date, end_date)
-    gemini_text = generate_gemini_text(destination_name, start_date, end_date)  # This call to Gemini is too expensive. It needs to be managed carefully.
+    gemini_text = get_travel_tips(destination_name, start_date)  # Served from the tips store; Gemini is only called on a miss (see `flask warm-tips`).
 
     return render_template(
         'place_information.html',
@@ -208,14 +242,91 @@ def places_of_interest():
             radius=4000  # 7km radius
         )
         interests = restaurants + cafes + museums + historical_sites  # Combine the results
+        interests.sort(key=lambda place: place['distance'])
 
         # Save all places of interest along with their distances
         places_of_interest_data['all_places'] = interests
+        # Clusters are precomputed once here so /api/places only filters by viewport
+        places_of_interest_data['cluster_index'] = build_cluster_index(interests)
 
     if form.validate_on_submit():
         places_of_interest_data['selected_places'] = form.places.data  # This is a list of strings. You need to handle it in the form rendering. See the forms.py
         return redirect(url_for('confirmation'))
-    return render_template('places_of_interest.html', form=form, interests=interests, destination_data=destination_data)
+    # Only the nearest places are rendered inline; the map fetches the rest per viewport from /api/places
+    return render_template(
+        'places_of_interest.html',
+        form=form,
+        interests=interests[:INITIAL_PLACES_SHOWN],
+        total_interests=len(interests),
+        destination_data=destination_data
+    )
+
+@app.route('/api/places', methods=['GET'])
+@login_required
+def places_geojson_api():
+    """Returns the places of interest in the current map bounds as GeoJSON, clustered by zoom."""
+    try:
+        bbox = parse_bbox(request.args.get('bbox', ''))
+        zoom = int(request.args.get('zoom', 13))
+    except ValueError:
+        return jsonify({'error': 'bbox must be west,south,east,north and zoom an integer'}), 400
+
+    places = places_of_interest_data.get('all_places', [])
+    cluster_index = places_of_interest_data.get('cluster_index')
+    if cluster_index is None:
+        cluster_index = places_of_interest_data['cluster_index'] = build_cluster_index(places)
+    return jsonify(places_geojson(places, cluster_index, bbox, zoom))
+
+def estimate_current_trip_cost():
+    """Estimates the cost of the trip being planned from the form data collected so far."""
+    return calculate_estimated_cost(
+        dates_data.get('num_travelers'),
+        (dates_data.get('end_date') - dates_data.get('start_date')).days,
+        destination_name=destination_data.get('destination_name'),
+        start_date=dates_data.get('start_date'),
+        transportation_methods=transportation_data.get('transportation_method', []),
+        accommodation_type=accommodation_data.get('accommodation_type')
+    )
+
+def parse_int_list(value):
+    return [int(item) for item in value.split(',') if item.strip()]
+
+@app.route('/api/costs/compare', methods=['GET'])
+@login_required
+def compare_costs():
+    """Returns a cost grid over date shifts, traveler counts and transport options.
+
+    Query parameters (all optional, defaulting to the trip being planned):
+    shifts=-7,0,7  travelers=1,2,4  transport=flight;train+local_transport  days=5
+    """
+    if not dates_data.get('start_date'):
+        return jsonify({'error': 'Choose your travel dates first'}), 400
+
+    current_travelers = dates_data.get('num_travelers') or 1
+    current_transport = '+'.join(transportation_data.get('transportation_method', []))
+    default_transport = ';'.join(dict.fromkeys(filter(None, [current_transport, *TRANSPORT_METHODS])))
+    try:
+        date_shifts = parse_int_list(request.args.get('shifts', '-14,-7,0,7,14'))
+        traveler_counts = parse_int_list(request.args.get('travelers', ','.join(str(n) for n in sorted({1, 2, 4, current_travelers}))))
+        transport_options = [option.split('+') if option else [] for option in request.args.get('transport', default_transport).split(';')]
+        num_days = int(request.args.get('days', (dates_data['end_date'] - dates_data['start_date']).days))
+        if not date_shifts or not traveler_counts or min(traveler_counts) < 1 or num_days < 0:
+            raise ValueError("shifts and travelers must be non-empty, travelers positive and days non-negative")
+        if len(date_shifts) * len(traveler_counts) * len(transport_options) > MAX_COST_SCENARIOS:
+            raise ValueError(f"At most {MAX_COST_SCENARIOS} scenarios can be compared at once")
+
+        result = compare_trip_costs(
+            destination_data.get('destination_name'),
+            dates_data['start_date'],
+            num_days,
+            traveler_counts=traveler_counts,
+            date_shifts=date_shifts,
+            transport_options=transport_options,
+            accommodation_type=accommodation_data.get('accommodation_type')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
 
 @app.route('/confirmation', methods=['GET', 'POST'])
 @login_required
@@ -246,8 +357,8 @@ def confirmation():
             reason_for_visiting=transportation_data.get('reason_for_visiting'),  # Changed from request.form.get()
             places_of_interest=','.join(places_of_interest_data.get('selected_places', [])),
             all_places=json.dumps(places_of_interest_data.get('all_places', [])),  # Save all places of interest as JSON
-            gemini_info=generate_gemini_text(destination_data.get('destination_name'), dates_data.get('start_date').strftime('%Y-%m-%d'), dates_data.get('end_date').strftime('%Y-%m-%d')),
-            estimated_cost=calculate_estimated_cost(dates_data.get('num_travelers'), (dates_data.get('end_date') - dates_data.get('start_date')).days),
+            gemini_info=get_travel_tips(destination_data.get('destination_name'), dates_data.get('start_date').strftime('%Y-%m-%d')),
+            estimated_cost=estimate_current_trip_cost(),
             weather_info=weather_info_json,  # Save weather_info as JSON string
             notes=request.form.get('notes')
         )
@@ -256,8 +367,7 @@ def confirmation():
         flash('Trip saved successfully!', 'success')
         return redirect(url_for('past_submissions'))
 
-    # Calculate total cost (replace with your actual logic)
-    estimated_cost = calculate_estimated_cost(dates_data.get('num_travelers'), (dates_data.get('end_date') - dates_data.get('start_date')).days)
+    estimated_cost = estimate_current_trip_cost()
     return render_template(
         'confirmation.html',
         destination=destination_data,
@@ -334,5 +444,30 @@ def generate_latest_trip_itinerary_pdf_with_gemini(trip_id):
     response.headers['Content-Disposition'] = f'attachment; filename=trip_itinerary_{trip_id}.pdf'
     
     return response
+
+@app.cli.command('warm-tips')
+@click.option('--top', default=20, show_default=True, help='Number of destination/month pairs to warm.')
+@click.option('--days', default=90, show_default=True, help='Only count trips starting within this many past days (upcoming trips always count).')
+@click.option('--workers', default=4, show_default=True, help='Maximum concurrent Gemini requests.')
+@click.option('--rate', default=30, show_default=True, help='Maximum Gemini requests started per minute.')
+@click.option('--force', is_flag=True, help='Regenerate tips that are already stored.')
+def warm_tips(top, days, workers, rate, force):
+    """Pre-generates travel tips for the most planned destinations."""
+    generated, skipped, failed = warm_travel_tips(
+        top_n=top,
+        lookback_days=days,
+        workers=workers,
+        rate_per_minute=rate,
+        force=force
+    )
+    click.echo(f"Warmed {generated} tips ({skipped} already stored, {failed} failed)")
+
+@app.cli.command('build-images')
+def build_images():
+    """Builds resized WebP variants of static/images and their manifest."""
+    manifest = build_image_variants()
+    reset_image_manifest()
+    click.echo(f"Built variants for {len(manifest['images'])} images in {IMAGE_BUILD_DIR}")
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,167 @@
+"""Trip cost engine.
+
+Costs for many scenarios (date shift x traveler count x transport option) are
+evaluated at once with numpy broadcasting over small pricing tables, so a full
+comparison grid costs about as much as a single estimate.
+"""
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from functions.gazetteer import normalize
+
+# Per-destination nightly room rate and daily spend per person (food, entry fees).
+# Keys are normalised destination names; anything else uses DEFAULT_DESTINATION_PRICING.
+DEFAULT_DESTINATION_PRICING = {'nightly_rate': 100.0, 'daily_per_person': 75.0}
+DESTINATION_PRICING = {
+    'mumbai': {'nightly_rate': 120.0, 'daily_per_person': 60.0},
+    'delhi': {'nightly_rate': 90.0, 'daily_per_person': 50.0},
+    'goa': {'nightly_rate': 110.0, 'daily_per_person': 55.0},
+    'jaipur': {'nightly_rate': 70.0, 'daily_per_person': 40.0},
+    'varanasi': {'nightly_rate': 50.0, 'daily_per_person': 30.0},
+    'rishikesh': {'nightly_rate': 45.0, 'daily_per_person': 30.0},
+    'haridwar': {'nightly_rate': 40.0, 'daily_per_person': 25.0},
+    'amritsar': {'nightly_rate': 50.0, 'daily_per_person': 25.0},
+    'tirupati': {'nightly_rate': 45.0, 'daily_per_person': 25.0},
+    'shirdi': {'nightly_rate': 40.0, 'daily_per_person': 25.0},
+    'ayodhya': {'nightly_rate': 55.0, 'daily_per_person': 30.0},
+    'bengaluru': {'nightly_rate': 95.0, 'daily_per_person': 50.0},
+    'chennai': {'nightly_rate': 80.0, 'daily_per_person': 45.0},
+    'kolkata': {'nightly_rate': 75.0, 'daily_per_person': 40.0},
+    'mecca': {'nightly_rate': 220.0, 'daily_per_person': 80.0},
+    'jerusalem': {'nightly_rate': 180.0, 'daily_per_person': 90.0},
+    'rome': {'nightly_rate': 170.0, 'daily_per_person': 95.0},
+    'lourdes': {'nightly_rate': 110.0, 'daily_per_person': 70.0},
+    'london': {'nightly_rate': 220.0, 'daily_per_person': 110.0},
+    'paris': {'nightly_rate': 200.0, 'daily_per_person': 105.0},
+    'new york': {'nightly_rate': 250.0, 'daily_per_person': 120.0},
+}
+
+# Nightly rate relative to the destination's rate, by the OSM type of the chosen accommodation.
+# Listings carry no prices, so this is the only signal for what a stay will cost; other types use 1.0.
+ACCOMMODATION_TYPE_MULTIPLIER = {
+    'hostel': 0.4,
+    'camp_site': 0.3,
+    'guest_house': 0.6,
+    'motel': 0.7,
+    'apartment': 0.9,
+    'hotel': 1.0,
+    'chalet': 1.2,
+    'resort': 1.6,
+}
+
+# Accommodation price multiplier by month of arrival (January first)
+SEASONAL_MULTIPLIER = np.array([1.15, 1.05, 1.0, 0.95, 0.9, 0.85, 0.85, 0.9, 0.95, 1.1, 1.2, 1.3])
+
+# Transport pricing: one row per method, columns are per person, per day (per vehicle)
+# and per person per day. A trip's transport option is any combination of methods.
+TRANSPORT_METHODS = ('flight', 'train', 'car_rental', 'local_transport')
+TRANSPORT_PRICING = np.array([
+    [250.0, 0.0, 0.0],   # flight: return ticket per person
+    [60.0, 0.0, 0.0],    # train: return ticket per person
+    [0.0, 45.0, 0.0],    # car_rental: per day for the whole group
+    [0.0, 0.0, 10.0],    # local_transport: per person per day
+])
+DEFAULT_TRANSPORT_COST = 200.0  # Used when no transport method is chosen
+
+TRAVELERS_PER_ROOM = 2
+MAX_DATE_SHIFT_DAYS = 365  # Date shifts are limited to a year either way
+
+
+def destination_pricing(destination_name):
+    """Looks up pricing by the full normalised name, then by its first component."""
+    first_part = (destination_name or '').split(',')[0]
+    for key in (normalize(destination_name or ''), normalize(first_part)):
+        if key in DESTINATION_PRICING:
+            return DESTINATION_PRICING[key]
+    return DEFAULT_DESTINATION_PRICING
+
+def accommodation_nightly_rate(destination_name, accommodation_type=None):
+    """The destination's nightly room rate scaled for the OSM type of the chosen accommodation."""
+    multiplier = ACCOMMODATION_TYPE_MULTIPLIER.get((accommodation_type or '').strip().lower(), 1.0)
+    return destination_pricing(destination_name)['nightly_rate'] * multiplier
+
+def _as_date(value):
+    if value is None:
+        return date.today()
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+def _transport_matrix(transport_options):
+    """Builds an (options x methods) 0/1 matrix. Unknown methods raise ValueError."""
+    matrix = np.zeros((len(transport_options), len(TRANSPORT_METHODS)))
+    for row, option in enumerate(transport_options):
+        for method in option:
+            if method not in TRANSPORT_METHODS:
+                raise ValueError(f"Unknown transport method: {method}")
+            matrix[row, TRANSPORT_METHODS.index(method)] = 1.0
+    return matrix
+
+
+def compare_trip_costs(destination_name, start_date, num_days, traveler_counts=(1,), date_shifts=(0,),
+                       transport_options=((),), accommodation_type=None):
+    """Evaluates every (date shift, traveler count, transport option) scenario at once.
+
+    `transport_options` is a list of method combinations, e.g. [('flight',), ('train', 'local_transport')].
+    `accommodation_type` is the OSM type of the chosen accommodation (e.g. 'hostel'), see
+    ACCOMMODATION_TYPE_MULTIPLIER.
+    Raises ValueError for unknown transport methods or shifts beyond MAX_DATE_SHIFT_DAYS.
+
+    Returns a dict with the axes and `totals`, a nested list shaped
+    [len(date_shifts)][len(traveler_counts)][len(transport_options)], plus per-component grids.
+    """
+    pricing = destination_pricing(destination_name)
+    nightly_rate = accommodation_nightly_rate(destination_name, accommodation_type)
+    start = _as_date(start_date)
+    transport_options = [tuple(option) for option in transport_options]
+    if any(abs(int(shift)) > MAX_DATE_SHIFT_DAYS for shift in date_shifts):
+        raise ValueError(f"Date shifts must be within {MAX_DATE_SHIFT_DAYS} days")
+
+    # Axes are laid out as (shift, travelers, transport) so they broadcast against each other
+    arrival_months = np.array([(start + timedelta(days=int(shift))).month - 1 for shift in date_shifts], dtype=int)
+    season = SEASONAL_MULTIPLIER[arrival_months][:, None, None]
+    travelers = np.asarray(traveler_counts, dtype=float)[None, :, None]
+    days = float(num_days)
+
+    rooms = np.ceil(travelers / TRAVELERS_PER_ROOM)
+    accommodation = nightly_rate * season * days * rooms
+    daily = pricing['daily_per_person'] * days * travelers
+
+    # (options x methods) @ (methods x 3) gives each option's per person / per day / per person-day rates
+    rates = _transport_matrix(transport_options) @ TRANSPORT_PRICING
+    per_person, per_day, per_person_day = (rates[:, column][None, None, :] for column in range(3))
+    transport = per_person * travelers + per_day * days + per_person_day * travelers * days
+    no_method = np.array([not option for option in transport_options])[None, None, :]
+    transport = np.where(no_method, DEFAULT_TRANSPORT_COST, transport)
+
+    shape = (len(arrival_months), travelers.shape[1], len(transport_options))
+    accommodation, daily, transport = (np.broadcast_to(grid, shape) for grid in (accommodation, daily, transport))
+    totals = accommodation + daily + transport
+
+    return {
+        'destination': destination_name,
+        'start_date': start.strftime('%Y-%m-%d'),
+        'num_days': int(num_days),
+        'date_shifts': [int(shift) for shift in date_shifts],
+        'traveler_counts': [int(count) for count in traveler_counts],
+        'transport_options': [list(option) for option in transport_options],
+        'totals': np.round(totals, 2).tolist(),
+        'accommodation': np.round(accommodation, 2).tolist(),
+        'daily_spend': np.round(daily, 2).tolist(),
+        'transport': np.round(transport, 2).tolist()
+    }
+
+def estimate_trip_cost(destination_name, start_date, num_days, travelers, transportation_methods=(), accommodation_type=None):
+    """Cost of a single trip: the one-cell case of compare_trip_costs."""
+    result = compare_trip_costs(
+        destination_name,
+        start_date,
+        num_days,
+        traveler_counts=(travelers,),
+        transport_options=(tuple(transportation_methods),),
+        accommodation_type=accommodation_type
+    )
+    return result['totals'][0][0][0]
@@ -0,0 +1,251 @@
+"""Offline destination gazetteer used for instant autosuggest.
+
+Places and pilgrimage sites are loaded from data/gazetteer.csv into a sorted key
+array (searched with bisect for prefix matches) and a trigram index (used for
+typo-tolerant matches when no prefix matches). Nominatim is only asked when there
+is no prefix match for a query of at least NOMINATIM_MIN_QUERY_LENGTH characters,
+see should_query_nominatim.
+
+Run `python -m functions.gazetteer` from the flask_project directory to benchmark
+lookups against simulated keystroke streams.
+"""
+import csv
+import os
+import re
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from functools import lru_cache
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'gazetteer.csv')
+
+# Letters that NFKD does not decompose into a base letter plus an accent
+_EXTRA_FOLDS = str.maketrans({'đ': 'd', 'ł': 'l', 'ø': 'o', 'æ': 'ae', 'œ': 'oe', 'ı': 'i', 'þ': 'th'})
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+# Shorter queries match too much to be worth a network round trip
+NOMINATIM_MIN_QUERY_LENGTH = 3
+
+
+def normalize(text):
+    """Lower-cases, strips accents and punctuation, and collapses whitespace."""
+    decomposed = unicodedata.normalize('NFKD', (text or '').casefold().translate(_EXTRA_FOLDS))
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(_NON_ALNUM.sub(' ', stripped).split())
+
+def _trigrams(text):
+    """Trigrams padded at the start only, since queries are prefixes of what the user wants."""
+    padded = '  ' + text
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _prefix_distance(query, term, max_distance):
+    """Edit distance between `query` and the closest prefix of `term`, or max_distance + 1."""
+    # Only cells within max_distance of the diagonal can stay under the limit, so the
+    # DP is restricted to that band; everything outside it counts as `limit`.
+    term = term[:len(query) + max_distance]
+    limit = max_distance + 1
+    previous = [j if j < limit else limit for j in range(len(term) + 1)]
+    for i, q_char in enumerate(query, 1):
+        current = [i if i < limit else limit] + [limit] * len(term)
+        row_min = current[0]
+        for j in range(max(1, i - max_distance), min(len(term), i + max_distance) + 1):
+            cost = previous[j - 1] + (q_char != term[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost if cost < limit else limit
+            if cost < row_min:
+                row_min = cost
+        if row_min >= limit:
+            return limit
+        previous = current
+    return min(previous)
+
+
+class Gazetteer:
+    """In-memory index over the bundled places and pilgrimage sites."""
+
+    def __init__(self, entries, max_scan=256):
+        self.entries = entries
+        self.max_scan = max_scan
+
+        # Prefix index: every word-boundary suffix of the display name and alternative
+        # names, sorted so a prefix query is a bisect plus a short forward scan.
+        # Quality 0 means the key starts at the beginning of a name, 1 a later word.
+        best = {}
+        for entry_id, entry in enumerate(entries):
+            for name in entry['names']:
+                words = name.split()
+                for word_index in range(len(words)):
+                    key = (' '.join(words[word_index:]), entry_id)
+                    quality = 0 if word_index == 0 else 1
+                    if quality < best.get(key, 2):
+                        best[key] = quality
+        ordered = sorted(best.items())
+        self.keys = [key for (key, _), _ in ordered]
+        self.key_ids = array('I', (entry_id for (_, entry_id), _ in ordered))
+        self.key_quality = bytes(quality for _, quality in ordered)
+
+        # Fuzzy index: trigram -> terms (whole names) containing it.
+        self.terms = []
+        self.term_ids = array('I')
+        postings = {}
+        for entry_id, entry in enumerate(entries):
+            for name in entry['names']:
+                term_index = len(self.terms)
+                self.terms.append(name)
+                self.term_ids.append(entry_id)
+                for gram in _trigrams(name):
+                    postings.setdefault(gram, array('I')).append(term_index)
+        self.trigrams = postings
+
+    @classmethod
+    def from_csv(cls, path=GAZETTEER_PATH):
+        entries = []
+        with open(path, newline='', encoding='utf-8') as csv_file:
+            for row in csv.DictReader(csv_file):
+                names = [row['display_name'], row['name']] + [alt for alt in row['alt_names'].split('|') if alt]
+                entries.append({
+                    'display_name': row['display_name'],
+                    'lat': row['lat'],
+                    'lon': row['lon'],
+                    'kind': row['kind'],
+                    'rank': int(row['rank'] or 0),
+                    'names': list(dict.fromkeys(filter(None, (normalize(name) for name in names))))
+                })
+        return cls(entries)
+
+    def _prefix_matches(self, query, found):
+        index = bisect_left(self.keys, query)
+        end = min(len(self.keys), index + self.max_scan)
+        while index < end and self.keys[index].startswith(query):
+            entry_id = self.key_ids[index]
+            quality = self.key_quality[index]
+            if quality < found.get(entry_id, 99):
+                found[entry_id] = quality
+            index += 1
+
+    def _fuzzy_matches(self, query, found):
+        max_distance = 1 if len(query) <= 7 else 2
+        grams = _trigrams(query)
+        overlap = Counter()
+        for gram in grams:
+            overlap.update(self.trigrams.get(gram, ()))
+        min_overlap = max(1, len(grams) - 3 * max_distance)
+        for term_index, shared in overlap.most_common(16):
+            if shared < min_overlap:
+                break
+            distance = _prefix_distance(query, self.terms[term_index], max_distance)
+            if distance <= max_distance:
+                entry_id = self.term_ids[term_index]
+                quality = 2 + distance
+                if quality < found.get(entry_id, 99):
+                    found[entry_id] = quality
+
+    def search(self, search_term, limit=5):
+        """Looks up Nominatim-shaped suggestions ranked by match quality and popularity.
+
+        Returns (matches, fuzzy_matches): prefix matches, and typo-tolerant matches that are
+        only tried when there are no prefix matches. Fuzzy matches are guesses, so callers
+        should not treat them as an answer on their own.
+        """
+        query = normalize(search_term)
+        if not query:
+            return [], []
+
+        found = {}
+        self._prefix_matches(query, found)
+        if not found and len(query) >= 3:
+            self._fuzzy_matches(query, found)
+
+        ranked = sorted(found, key=lambda entry_id: (found[entry_id], -self.entries[entry_id]['rank']))[:limit]
+        matches, fuzzy_matches = [], []
+        for entry_id in ranked:
+            suggestion = {
+                'display_name': self.entries[entry_id]['display_name'],
+                'lat': self.entries[entry_id]['lat'],
+                'lon': self.entries[entry_id]['lon']
+            }
+            (fuzzy_matches if found[entry_id] >= 2 else matches).append(suggestion)
+        return matches, fuzzy_matches
+
+
+@lru_cache(maxsize=1)
+def load_gazetteer(path=GAZETTEER_PATH):
+    """Loads the bundled gazetteer once per process."""
+    return Gazetteer.from_csv(path)
+
+def search_gazetteer(search_term, limit=5):
+    """Looks up suggestions in the offline gazetteer; see Gazetteer.search for the result.
+
+    Returns ([], []) if the dataset is unavailable.
+    """
+    try:
+        return load_gazetteer().search(search_term, limit)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Error loading gazetteer: {e}")
+        return [], []
+
+def should_query_nominatim(search_term, matches):
+    """Nominatim is only a fallback: asked when there is no prefix match for a long enough query."""
+    return not matches and len(normalize(search_term)) >= NOMINATIM_MIN_QUERY_LENGTH
+
+
+# Destinations as users actually type them: mixed case, missing accents and common misspellings,
+# plus real places that are not in the dataset and must still reach Nominatim.
+BENCHMARK_STREAMS = [
+    'Varanasi', 'varnasi', 'Golden Temple', 'golden temple amritsar', 'Harmandir Sahib', 'tirupati balaji',
+    'tirupathi', 'Vaishno Devi', 'vaisno devi', 'Kedarnath', 'kedarnat', 'Rishikesh', 'rishikesh', 'haridwar',
+    'Shirdi', 'Ayodhya', 'ram mandir', 'Bodh Gaya', 'bodhgaya', 'Mecca', 'makkah', 'Jerusalem', 'jerusalam',
+    'Lourdes', 'Fatima', 'Santiago de Compostela', 'Vatican', 'Bangalore', 'Bengaluru', 'mumbai', 'Bombay',
+    'goa', 'Jaipur', 'jaipru', 'Zurich', 'koln', 'Sao Paulo', 'Medjugorje', 'Czestochowa', 'sabarimala',
+    'Kanyakumari', 'kanyakumri', 'Pashupatinath', 'Angkor Wat', 'Tigers Nest', 'New York', 'London', 'Atlantis',
+    'Raipur', 'Ranchi', 'Kota', 'Bhuj', 'Patan', 'Mahabaleshwar'
+]
+
+def run_benchmark(streams=BENCHMARK_STREAMS, rounds=50, limit=5, nominatim_ms=300):
+    """Replays every keystroke prefix (from two characters on) of each stream and reports latency.
+
+    Local lookups are timed directly. Keystrokes routed to Nominatim by should_query_nominatim
+    are charged a stubbed `nominatim_ms` on top, so the end-to-end figures include the network.
+    """
+    started = time.perf_counter()
+    gazetteer = Gazetteer.from_csv()
+    load_ms = (time.perf_counter() - started) * 1000
+
+    keystrokes = [stream[:length] for stream in streams for length in range(2, len(stream) + 1)]
+    local_timings = []
+    end_to_end_timings = []
+    remote = 0
+    for _ in range(rounds):
+        for prefix in keystrokes:
+            started = time.perf_counter_ns()
+            matches, _ = gazetteer.search(prefix, limit)
+            routed = should_query_nominatim(prefix, matches)
+            elapsed = time.perf_counter_ns() - started
+            local_timings.append(elapsed)
+            end_to_end_timings.append(elapsed + (nominatim_ms * 1_000_000 if routed else 0))
+            remote += routed
+    local_timings.sort()
+    end_to_end_timings.sort()
+
+    def percentile(timings, p):
+        return timings[min(len(timings) - 1, int(len(timings) * p))] / 1000
+
+    def summary(timings):
+        return (f"p50 {percentile(timings, 0.50):.1f} us | p95 {percentile(timings, 0.95):.1f} us | "
+                f"p99 {percentile(timings, 0.99):.1f} us | max {timings[-1] / 1000:.1f} us")
+
+    print(f"Loaded {len(gazetteer.entries)} places ({len(gazetteer.keys)} prefix keys) in {load_ms:.1f} ms")
+    print(f"{len(local_timings)} lookups over {len(streams)} keystroke streams")
+    print(f"Sent to Nominatim: {remote / len(local_timings):.1%} of keystrokes")
+    print(f"Gazetteer only:           {summary(local_timings)}")
+    print(f"End to end ({nominatim_ms} ms stub): {summary(end_to_end_timings)}")
+    remote_streams = [stream for stream in streams if should_query_nominatim(stream, gazetteer.search(stream, limit)[0])]
+    print(f"Completed streams sent to Nominatim ({len(remote_streams)}/{len(streams)}): {', '.join(remote_streams)}")
+
+if __name__ == '__main__':
+    run_benchmark()
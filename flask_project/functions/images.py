@@ -0,0 +1,232 @@
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+from functions.gazetteer import normalize
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is only needed to build variants, not to serve them
+    Image = None
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_DIR = os.path.join(PROJECT_DIR, 'static')
+IMAGE_SOURCE_DIR = os.path.join(STATIC_DIR, 'images')
+# Build output lives outside static/ so only the /assets/images route serves it, and the
+# mutable manifest and lock file sit next to (not inside) the served variants directory.
+IMAGE_BUILD_DIR = os.path.join(PROJECT_DIR, 'build', 'images')
+IMAGE_MANIFEST_PATH = os.path.join(PROJECT_DIR, 'build', 'image-manifest.json')
+IMAGE_BUILD_LOCK_PATH = os.path.join(PROJECT_DIR, 'build', 'image-build.lock')
+IMAGE_BUILD_LOCK_STALE_SECONDS = 600  # A lock older than this is left over from a crashed build
+
+# Variant names look like 'destination1-960.0123456789ab.webp'
+_VARIANT_NAME = re.compile(r'-\d+\.[0-9a-f]{12}\.[a-z]+$')
+
+IMAGE_WIDTHS = (480, 960, 1600)
+WEBP_QUALITY = 75
+DEFAULT_DESTINATION_IMAGE = 'default-destination'
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+MANIFEST_RECHECK_SECONDS = 30  # How often a worker without a manifest looks for one again
+
+_manifest = None
+_manifest_checked_at = 0.0
+_manifest_lock = threading.Lock()
+_build_started = False
+
+
+def slugify(destination_name):
+    """Turns 'Golden Temple, Amritsar' into 'golden-temple-amritsar'."""
+    return normalize(destination_name).replace(' ', '-')
+
+def _source_images(source_dir):
+    """Yields (name, path) for every source image, where name is the path without extension."""
+    for root, _, files in os.walk(source_dir):
+        for filename in sorted(files):
+            stem, extension = os.path.splitext(filename)
+            if extension.lower() in SOURCE_EXTENSIONS:
+                relative_dir = os.path.relpath(root, source_dir)
+                name = stem if relative_dir == '.' else f"{relative_dir.replace(os.sep, '/')}/{stem}"
+                yield name, os.path.join(root, filename)
+
+def _write_atomic(path, data):
+    """Writes to a temporary file and renames it into place, so readers never see a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            temp_file.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+def is_variant_filename(filename):
+    """True for content-hashed variant names, the only files served with immutable caching."""
+    return bool(_VARIANT_NAME.search(filename))
+
+def _remove_orphaned_variants(build_dir, referenced):
+    """Deletes variants the manifest no longer references, e.g. after a source image changed."""
+    for root, _, files in os.walk(build_dir):
+        for filename in files:
+            relative = os.path.relpath(os.path.join(root, filename), build_dir).replace(os.sep, '/')
+            if is_variant_filename(filename) and relative not in referenced:
+                os.remove(os.path.join(root, filename))
+
+def build_image_variants(source_dir=IMAGE_SOURCE_DIR, build_dir=IMAGE_BUILD_DIR, manifest_path=IMAGE_MANIFEST_PATH,
+                         widths=IMAGE_WIDTHS, quality=WEBP_QUALITY):
+    """Writes resized WebP variants with content-hashed names and a manifest describing them.
+
+    The manifest maps each source image name (e.g. 'destination1' or 'destinations/goa')
+    to {width: filename}. Images are never upscaled, and a full-size original is kept
+    as-is when WebP would not make it smaller. Variants from earlier builds that are no
+    longer referenced are deleted. Returns the manifest.
+    """
+    if Image is None:
+        raise RuntimeError("Pillow is required to build image variants (pip install Pillow)")
+
+    os.makedirs(build_dir, exist_ok=True)
+    images = {}
+    for name, path in _source_images(source_dir):
+        with Image.open(path) as source:
+            source = source.convert('RGB')
+            variants = {}
+            for width in sorted(set(min(width, source.width) for width in widths)):
+                height = round(source.height * width / source.width)
+                resized = source if width == source.width else source.resize((width, height), Image.LANCZOS)
+                buffer = io.BytesIO()
+                resized.save(buffer, 'WEBP', quality=quality, method=6)
+                data = buffer.getvalue()
+                extension = '.webp'
+                if width == source.width and len(data) >= os.path.getsize(path):
+                    # Recompressing an already small original does not pay off; keep its bytes
+                    with open(path, 'rb') as original:
+                        data = original.read()
+                    extension = os.path.splitext(path)[1].lower()
+
+                digest = hashlib.sha256(data).hexdigest()[:12]
+                filename = f"{name}-{width}.{digest}{extension}"
+                output_path = os.path.join(build_dir, *filename.split('/'))
+                if not os.path.exists(output_path):
+                    _write_atomic(output_path, data)
+                variants[str(width)] = filename
+        images[name] = variants
+
+    manifest = {'images': images}
+    _write_atomic(manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    _remove_orphaned_variants(build_dir, {filename for variants in images.values() for filename in variants.values()})
+    return manifest
+
+def _acquire_build_lock():
+    """Creates the lock file so only one process builds on first request. False if another holds it."""
+    os.makedirs(os.path.dirname(IMAGE_BUILD_LOCK_PATH), exist_ok=True)
+    try:
+        if time.time() - os.path.getmtime(IMAGE_BUILD_LOCK_PATH) > IMAGE_BUILD_LOCK_STALE_SECONDS:
+            os.remove(IMAGE_BUILD_LOCK_PATH)
+    except OSError:
+        pass
+    try:
+        os.close(os.open(IMAGE_BUILD_LOCK_PATH, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        return False
+
+def _build_in_background():
+    """Builds the variants without holding up requests, then makes the next request reload them."""
+    if not _acquire_build_lock():
+        return  # Another worker is building; this one picks up its manifest once it exists
+    try:
+        build_image_variants()
+    except (OSError, RuntimeError) as e:
+        print(f"Error building image variants: {e}")
+        return
+    finally:
+        os.remove(IMAGE_BUILD_LOCK_PATH)
+    reset_image_manifest()
+
+def _start_background_build():
+    """Starts at most one background build per process; the lock file limits it to one per host."""
+    global _build_started
+    if Image is None or _build_started:
+        return
+    _build_started = True
+    threading.Thread(target=_build_in_background, name='image-variants', daemon=True).start()
+
+def _manifest_is_current():
+    if _manifest is None:
+        return False
+    # A fallback (originals only) manifest is re-read now and then, in case a build finished
+    return bool(_manifest['images']) or time.monotonic() - _manifest_checked_at < MANIFEST_RECHECK_SECONDS
+
+def load_image_manifest():
+    """Loads the manifest once per process.
+
+    If no manifest has been built yet, the originals are served while one background thread
+    (across all workers, guarded by a lock file) builds the variants when Pillow is available.
+    Deployments should run `flask build-images` instead so no request ever triggers a build.
+    """
+    global _manifest, _manifest_checked_at
+    if _manifest_is_current():
+        return _manifest
+    with _manifest_lock:
+        if _manifest_is_current():
+            return _manifest
+        manifest = {'images': {}}
+        try:
+            with open(IMAGE_MANIFEST_PATH, encoding='utf-8') as manifest_file:
+                manifest = json.load(manifest_file)
+        except FileNotFoundError:
+            _start_background_build()
+        except ValueError as e:
+            print(f"Error reading image manifest: {e}")
+        # Originals are tracked too so a missing image never costs a 404 round trip
+        manifest['originals'] = {
+            name: os.path.relpath(path, STATIC_DIR).replace(os.sep, '/')
+            for name, path in _source_images(IMAGE_SOURCE_DIR)
+        }
+        _manifest = manifest
+        _manifest_checked_at = time.monotonic()
+        return manifest
+
+def reset_image_manifest():
+    """Forgets the loaded manifest so the next request reads the rebuilt one."""
+    global _manifest
+    with _manifest_lock:
+        _manifest = None
+
+
+def image_exists(name):
+    manifest = load_image_manifest()
+    return name in manifest['images'] or name in manifest['originals']
+
+def destination_image_name(destination_name):
+    """Returns the image name for a destination, or the default image if there is none.
+
+    Both the full name and its first component are tried, so 'Goa, India' can use
+    images/destinations/goa.jpg.
+    """
+    first_part = (destination_name or '').split(',')[0]
+    for candidate in (slugify(destination_name or ''), slugify(first_part)):
+        if candidate and image_exists(f"destinations/{candidate}"):
+            return f"destinations/{candidate}"
+    return DEFAULT_DESTINATION_IMAGE
+
+def image_variant(name, width):
+    """Returns (filename, is_optimized) for the smallest variant at least `width` wide."""
+    manifest = load_image_manifest()
+    variants = manifest['images'].get(name)
+    if variants:
+        widths = sorted(int(w) for w in variants)
+        chosen = next((w for w in widths if w >= width), widths[-1])
+        return variants[str(chosen)], True
+    return manifest['originals'].get(name, manifest['originals'].get(DEFAULT_DESTINATION_IMAGE)), False
+
+def image_srcset_entries(name):
+    """Returns [(filename, width), ...] for a srcset, or [] if no variants are built."""
+    variants = load_image_manifest()['images'].get(name, {})
+    return sorted(((filename, int(width)) for width, filename in variants.items()), key=lambda entry: entry[1])
@@ -0,0 +1,88 @@
+from math import log, pi, sin
+
+MIN_ZOOM = 0
+MAX_ZOOM = 19
+CLUSTER_MAX_ZOOM = 16  # Above this zoom every place is returned as its own marker
+CLUSTER_CELL_PIXELS = 60  # Size of a clustering grid cell on screen
+
+
+def _world_pixels(lat, lon, zoom):
+    """Projects a coordinate to Web Mercator pixel space at the given zoom (256px tiles)."""
+    scale = 256 * 2 ** zoom
+    sin_lat = min(max(sin(lat * pi / 180), -0.9999), 0.9999)
+    x = (lon + 180) / 360 * scale
+    y = (0.5 - log((1 + sin_lat) / (1 - sin_lat)) / (4 * pi)) * scale
+    return x, y
+
+def build_cluster_index(places):
+    """Precomputes grid clusters for every zoom level.
+
+    Returns {zoom: [(lat, lon, [place indices]), ...]} where lat/lon is the centroid
+    of the cell, so a viewport request only has to filter cells, not re-cluster.
+    """
+    index = {}
+    for zoom in range(MIN_ZOOM, CLUSTER_MAX_ZOOM + 1):
+        cells = {}
+        for place_index, place in enumerate(places):
+            x, y = _world_pixels(place['lat'], place['lon'], zoom)
+            cells.setdefault((int(x // CLUSTER_CELL_PIXELS), int(y // CLUSTER_CELL_PIXELS)), []).append(place_index)
+        index[zoom] = [
+            (
+                sum(places[i]['lat'] for i in members) / len(members),
+                sum(places[i]['lon'] for i in members) / len(members),
+                members
+            )
+            for members in cells.values()
+        ]
+    return index
+
+def parse_bbox(bbox):
+    """Parses a Leaflet 'west,south,east,north' bounds string. Raises ValueError if malformed."""
+    west, south, east, north = (float(value) for value in bbox.split(','))
+    if south > north:
+        raise ValueError("south must not be greater than north")
+    return west, south, east, north
+
+def _in_bbox(lat, lon, bbox):
+    west, south, east, north = bbox
+    if not south <= lat <= north:
+        return False
+    if west <= east:
+        return west <= lon <= east
+    return lon >= west or lon <= east  # Bounds crossing the antimeridian
+
+def _place_feature(place):
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [place['lon'], place['lat']]},
+        'properties': {
+            'cluster': False,
+            'name': place['name'],
+            'full_address': place['full_address'],
+            'type': place['type'],
+            'distance': place['distance']
+        }
+    }
+
+def _cluster_feature(lat, lon, count):
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+        'properties': {'cluster': True, 'point_count': count}
+    }
+
+def places_geojson(places, cluster_index, bbox, zoom):
+    """Returns a GeoJSON FeatureCollection of the places and clusters visible in `bbox` at `zoom`."""
+    zoom = min(max(int(zoom), MIN_ZOOM), MAX_ZOOM)
+    features = []
+    if zoom > CLUSTER_MAX_ZOOM:
+        features = [_place_feature(place) for place in places if _in_bbox(place['lat'], place['lon'], bbox)]
+    else:
+        for lat, lon, members in cluster_index.get(zoom, []):
+            if not _in_bbox(lat, lon, bbox):
+                continue
+            if len(members) == 1:
+                features.append(_place_feature(places[members[0]]))
+            else:
+                features.append(_cluster_feature(lat, lon, len(members)))
+    return {'type': 'FeatureCollection', 'features': features}
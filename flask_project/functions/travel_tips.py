@@ -0,0 +1,151 @@
+import calendar
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Trip, TravelTip
+from functions.gazetteer import normalize
+from functions.utils import generate_gemini_text, GEMINI_TEXT_FALLBACK
+
+
+def normalize_destination(destination_name):
+    """Normalises a destination name the same way as pricing and image slugs, so 'Köln' and 'koln' share tips."""
+    return normalize(destination_name)
+
+def month_key(date_value):
+    """Returns the 'YYYY-MM' key for a date or a 'YYYY-MM-DD' string."""
+    if isinstance(date_value, str):
+        date_value = datetime.strptime(date_value, '%Y-%m-%d')
+    return date_value.strftime('%Y-%m')
+
+def month_window(month):
+    """Returns the first and last day of a 'YYYY-MM' month as 'YYYY-MM-DD' strings."""
+    year, month_number = (int(part) for part in month.split('-'))
+    last_day = calendar.monthrange(year, month_number)[1]
+    return f"{year:04d}-{month_number:02d}-01", f"{year:04d}-{month_number:02d}-{last_day:02d}"
+
+
+def get_cached_travel_tips(destination_name, start_date_str):
+    """Returns stored tips for the destination and travel month, or None if nothing is stored."""
+    tip = TravelTip.query.filter_by(
+        destination=normalize_destination(destination_name),
+        month=month_key(start_date_str)
+    ).first()
+    return tip.content if tip else None
+
+def store_travel_tips(destination_name, month, content):
+    """Inserts or replaces the stored tips for a destination and month, and commits.
+
+    Two requests (or a request and `warm-tips`) can miss on the same pair at once; the
+    loser of the insert race rolls back and updates the row the winner created.
+    """
+    destination = normalize_destination(destination_name)
+    tip = TravelTip.query.filter_by(destination=destination, month=month).first()
+    if tip is None:
+        db.session.add(TravelTip(destination=destination, month=month, content=content))
+        try:
+            db.session.commit()
+            return
+        except IntegrityError:
+            db.session.rollback()
+            tip = TravelTip.query.filter_by(destination=destination, month=month).one()
+    tip.content = content
+    tip.created_at = datetime.utcnow()
+    db.session.commit()
+
+def get_travel_tips(destination_name, start_date_str):
+    """Reads tips for the travel month from the store and only falls back to Gemini on a miss.
+
+    Tips are generated for the whole month, not the caller's exact dates, because they are
+    shared with everyone travelling to the destination that month.
+    """
+    cached = get_cached_travel_tips(destination_name, start_date_str)
+    if cached:
+        return cached
+
+    month = month_key(start_date_str)
+    content = generate_gemini_text(destination_name, *month_window(month))
+    if content and content != GEMINI_TEXT_FALLBACK:
+        store_travel_tips(destination_name, month, content)
+    return content
+
+
+def popular_destinations(top_n=20, lookback_days=90):
+    """Aggregates recent trips by destination and travel month and returns the top-N pairs.
+
+    A trip counts as recent when it starts no earlier than `lookback_days` ago, so
+    upcoming trips are included as well. Returns a list of (destination, month, count).
+    """
+    since = datetime.now().date() - timedelta(days=lookback_days)
+    rows = db.session.query(Trip.destination, Trip.start_date).filter(Trip.start_date >= since).all()
+
+    counts = Counter()
+    display_names = {}
+    for destination, start_date in rows:
+        key = (normalize_destination(destination), month_key(start_date))
+        counts[key] += 1
+        display_names.setdefault(key[0], destination.strip())
+
+    return [(display_names[destination], month, count)
+            for (destination, month), count in counts.most_common(top_n)]
+
+
+class RateLimiter:
+    """Spaces out calls across threads so no more than `rate_per_minute` start per minute."""
+
+    def __init__(self, rate_per_minute):
+        self.interval = 60.0 / rate_per_minute if rate_per_minute > 0 else 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def warm_travel_tips(top_n=20, lookback_days=90, workers=4, rate_per_minute=30, force=False):
+    """Pre-generates tips for the most planned destination/month pairs.
+
+    Gemini calls run on a bounded thread pool behind a shared rate limiter. Results are
+    written from the calling thread (which owns the app context) and committed one by one,
+    so a failure or a race with a web request never loses tips that were already generated.
+    Returns a (generated, skipped, failed) tuple.
+    """
+    targets = popular_destinations(top_n, lookback_days)
+    if not force:
+        stored = {(tip.destination, tip.month) for tip in TravelTip.query.with_entities(TravelTip.destination, TravelTip.month)}
+        pending = [t for t in targets if (normalize_destination(t[0]), t[1]) not in stored]
+    else:
+        pending = targets
+    skipped = len(targets) - len(pending)
+
+    limiter = RateLimiter(rate_per_minute)
+
+    def generate(destination, month):
+        limiter.wait()
+        start_date, end_date = month_window(month)
+        return generate_gemini_text(destination, start_date, end_date)
+
+    generated = failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(generate, destination, month): (destination, month)
+                   for destination, month, _ in pending}
+        for future in as_completed(futures):
+            destination, month = futures[future]
+            content = future.result()
+            if not content or content == GEMINI_TEXT_FALLBACK:
+                print(f"Could not warm tips for {destination} ({month})")
+                failed += 1
+                continue
+            store_travel_tips(destination, month, content)
+            generated += 1
+
+    return generated, skipped, failed
@@ -4,26 +4,30 @@ from datetime import datetime
 import google.generativeai as genai #Google Gemini API
 import aiohttp
 import asyncio
+from functions.gazetteer import normalize, search_gazetteer, should_query_nominatim
+from functions.costs import estimate_trip_cost
 
 NOMINATIM_BASE_URL = "https://nominatim.openstreetmap.org/search"
 NOMINATIM_REVERSE_URL = "https://nominatim.openstreetmap.org/reverse"
 NOMINATIM_NEARBY_URL = "https://nominatim.openstreetmap.org/search"
+NOMINATIM_SUGGEST_TIMEOUT = 2  # Seconds; autosuggest must not hang on a slow Nominatim
 # Remove or comment out the Google Places API URL
 # GOOGLE_PLACES_API_URL = "https://maps.googleapis.com/maps/..."
 
 OPENWEATHERMAP_API_URL = "https://api.openweathermap.org/data/2.5/forecast"
 PLACE_DETAILS_API_URL = 'https://maps.googleapis.com/maps/api/place/details/json'
 GOOGLE_GEMINI_API_KEY = genai.configure(api_key=os.getenv("GOOGLE_GEMINI_API_KEY"))
+GEMINI_TEXT_FALLBACK = "Could not generate information at this time. Please try again later."
 
 
 async def fetch_nominatim_suggestions(search_term, limit=5):
-    """Fetches places of worship for all religions based on the location name asynchronously."""
-    print(f"Searching for: {search_term}")  # Debug log
+    """Fetches destination suggestions from Nominatim asynchronously."""
+    print(f"Searching Nominatim for: {search_term}")  # Debug log
     
     params = {
         'q': search_term,
         'format': 'json',
-        'limit': 10,  # Fetch more results to filter properly
+        'limit': limit,
         'accept-language': 'en'
     }
     
@@ -31,41 +35,56 @@ async def fetch_nominatim_suggestions(search_term, limit=5):
         'User-Agent': 'PilgrimPlanner/1.0 (ralphaacarvalho@gmail.com)'
     }
     
-    async with aiohttp.ClientSession() as session:
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=NOMINATIM_SUGGEST_TIMEOUT)) as session:
         try:
             async with session.get(NOMINATIM_BASE_URL, params=params, headers=headers) as response:
                 response.raise_for_status()
                 results = await response.json()
                 
-                filtered_results = []
-                search_term_lower = search_term.lower()
+                return [
+                    {
+                        'display_name': place.get('display_name', ''),
+                        'lat': place.get('lat'),
+                        'lon': place.get('lon')
+                    }
+                    for place in results
+                ]
                 
-                # Keywords to identify places of worship
-                worship_keywords = ["temple", "church", "mosque", "synagogue", "basilica", "gurdwara", 
-                                    "cathedral", "shrine", "monastery", "asram", "stupa", "mandir"," "]
-                
-                for place in results:
-                    display_name = place.get('display_name', '')
-                    name = place.get('name', '')
-
-                    # Check if the place name or description contains religious keywords
-                    if any(keyword in display_name.lower() or keyword in name.lower() for keyword in worship_keywords):
-                        filtered_place = {
-                            'display_name': display_name,
-                            'lat': place.get('lat'),
-                            'lon': place.get('lon')
-                        }
-                        filtered_results.append(filtered_place)
-                
-                return filtered_results[:limit]
-                
-        except aiohttp.ClientError as e:
-            print(f"Error during Nominatim API call: {e}")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error during Nominatim API call: {e!r}")
             return []
 
-# To call the async function
+def merge_suggestions(*groups, limit=5):
+    """Concatenates suggestion lists in order, dropping repeats of the same place."""
+    merged = []
+    seen = set()
+    for group in groups:
+        for suggestion in group:
+            try:
+                key = (
+                    normalize(suggestion['display_name'].split(',')[0]),
+                    round(float(suggestion['lat']), 1),
+                    round(float(suggestion['lon']), 1)
+                )
+            except (TypeError, ValueError):
+                key = normalize(suggestion['display_name'])
+            if key not in seen:
+                seen.add(key)
+                merged.append(suggestion)
+    return merged[:limit]
+
 def get_nominatim_suggestions(search_term, limit=5):
-    return asyncio.run(fetch_nominatim_suggestions(search_term, limit))
+    """Suggests destinations from the offline gazetteer, using Nominatim only as a fallback.
+
+    Any prefix match is returned straight away. Otherwise (see should_query_nominatim)
+    Nominatim's results are shown ahead of the gazetteer's typo-tolerant guesses, so real
+    places missing from the dataset can still be picked.
+    """
+    matches, fuzzy_matches = search_gazetteer(search_term, limit)
+    if not should_query_nominatim(search_term, matches):
+        return matches
+    remote = asyncio.run(fetch_nominatim_suggestions(search_term, limit))
+    return merge_suggestions(remote, fuzzy_matches, limit=limit)
 
 def get_nearby_places(latitude, longitude, search_type, radius=5000):
     """Fetches nearby places using Nominatim API."""
@@ -266,14 +285,11 @@ give it in raw HTML code. NO MARKDOWN SYNTAX ALLOWED
         return clean_text
     except Exception as e:
         print(f"Gemini API Error: {e}")
-        return "Could not generate information at this time. Please try again later."
+        return GEMINI_TEXT_FALLBACK
 
-def calculate_estimated_cost(travelers, num_days, accommodation_cost_per_night=100,  transport_cost=200, daily_cost_per_person = 75):
-    """Provides a very basic cost estimation.  This should be refined."""
-    accommodation_cost = accommodation_cost_per_night * num_days
-    food_cost = daily_cost_per_person * num_days * travelers
-    total_cost = accommodation_cost + transport_cost + food_cost
-    return total_cost
+def calculate_estimated_cost(travelers, num_days, destination_name=None, start_date=None, transportation_methods=(), accommodation_type=None):
+    """Estimates the cost of a single trip using the pricing tables in functions/costs.py."""
+    return estimate_trip_cost(destination_name, start_date, num_days, travelers, transportation_methods, accommodation_type)
 
 def get_place_details(place_id):
     """Fetches detailed information about a place using Google Places API."""
@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from datetime import datetime
 
 db = SQLAlchemy()
 
@@ -26,6 +27,18 @@ class Trip(db.Model):
     def __repr__(self):
         return f"<Trip(destination='{self.destination}', start_date='{self.start_date}', end_date='{self.end_date}')>"
 
+class TravelTip(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    destination = db.Column(db.String(100), nullable=False)  # Destination name normalised with functions.gazetteer.normalize
+    month = db.Column(db.String(7), nullable=False)  # Travel month as 'YYYY-MM'
+    content = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('destination', 'month', name='uq_travel_tip_destination_month'),)
+
+    def __repr__(self):
+        return f"<TravelTip(destination='{self.destination}', month='{self.month}')>"
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(255), unique=True, nullable=False)